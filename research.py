@@ -1,21 +1,37 @@
 
 import numpy as np
 import pandas as pd
-import statsmodels.api as sm
-from statsmodels.tsa.stattools import coint
+from joblib import Parallel, delayed
+from numba import njit
+from statsmodels.tsa.adfvalues import mackinnonp
+from statsmodels.tsa.stattools import adfuller
 from typing import List, Tuple
 
 
 def load_normalized_data(path: str = "normalized_data.parquet") -> pd.DataFrame:
-    return pd.read_parquet(path)
+    return pd.read_parquet(
+        path,
+        engine="pyarrow",
+        columns=["timestamp", "id", "mid_usd", "ask_usd", "bid_usd", "spread_usd"],
+    )
 
 
 def compute_log_returns(df: pd.DataFrame) -> pd.DataFrame:
     """Compute log returns of mid prices grouped by instrument id."""
-    df["logret"] = (
-        df.groupby("id")["mid_usd"]
-        .transform(lambda x: np.log(x) - np.log(x.shift(1)))
-    )
+    # sort once so each id is a contiguous block, then one vectorized diff
+    df.sort_values(["id", "timestamp"], inplace=True, kind="stable")
+    df.reset_index(drop=True, inplace=True)
+
+    lm = np.log(df["mid_usd"].to_numpy())
+    lr = np.empty_like(lm)
+    lr[0] = np.nan
+    lr[1:] = lm[1:] - lm[:-1]
+
+    # first row of each id block has no previous price
+    ids = df["id"].to_numpy()
+    lr[1:][ids[1:] != ids[:-1]] = np.nan
+
+    df["logret"] = lr
     return df
 
 
@@ -27,6 +43,52 @@ def get_logret_pivot(df: pd.DataFrame) -> pd.DataFrame:
 
 
 
+def _fit_line(y: np.ndarray, x: np.ndarray) -> Tuple[float, float, np.ndarray]:
+    """
+    Single-regressor OLS via centered closed form: returns (alpha, beta,
+    residuals). A few BLAS-1 reductions instead of a statsmodels Results
+    object with unused covariance/influence machinery.
+    """
+    xm = x - x.mean()
+    ym = y - y.mean()
+    beta = (xm @ ym) / (xm @ xm)
+    alpha = y.mean() - beta * x.mean()
+    resid = y - alpha - beta * x
+    return alpha, beta, resid
+
+
+def _test_pair(
+    ya: np.ndarray,
+    xb: np.ndarray,
+    valid_a: np.ndarray,
+    valid_b: np.ndarray,
+    a: str,
+    b: str,
+    coeff: float,
+    min_obs: int,
+) -> dict | None:
+    """Run the OLS fit and cointegration test for one candidate pair."""
+    both = valid_a & valid_b
+    if both.sum() < min_obs:
+        return None
+    y = ya[both]
+    x = xb[both]
+    _, beta, resid = _fit_line(y, x)
+    # coint() would refit the same OLS internally; run the ADF test on
+    # the residuals we already have and map through the MacKinnon
+    # two-variable surface, which is exactly what coint() does
+    adf_stat = adfuller(resid, regression="n", autolag="aic")[0]
+    p_val = mackinnonp(adf_stat, regression="c", N=2)
+    return {
+        "A": a,
+        "B": b,
+        "corr": coeff,
+        "beta": beta,
+        "resid_std": np.std(resid, ddof=1),
+        "pval": p_val,
+    }
+
+
 def find_cointegrated_pairs(
     pivot: pd.DataFrame, threshold: float = 0.5, min_obs: int = 500
 ) -> pd.DataFrame:
@@ -35,36 +97,65 @@ def find_cointegrated_pairs(
     Returns DataFrame sorted by p-value of cointegration test.
     """
     corr = pivot.corr()
-    pairs = [
-        (a, b, corr.loc[a, b])
-        for a in corr.columns
-        for b in corr.columns
-        if a < b and corr.loc[a, b] > threshold
-    ]
-
-    records = []
-    for a, b, coeff in pairs:
-        s_a = pivot[a].dropna()
-        s_b = pivot[b].dropna()
-        idx = s_a.index.intersection(s_b.index)
-        if len(idx) < min_obs:
-            continue
-        y = s_a.loc[idx]
-        x = s_b.loc[idx]
-        model = sm.OLS(y, sm.add_constant(x)).fit()
-        beta = model.params.iloc[1]
-        p_val = coint(y, x)[1]
-        records.append({
-            "A": a,
-            "B": b,
-            "corr": coeff,
-            "beta": beta,
-            "resid_std": model.resid.std(),
-            "pval": p_val,
-        })
+    # filter the upper triangle in one vectorized compare instead of
+    # K^2 .loc lookups
+    cm = corr.to_numpy()
+    iu = np.triu_indices_from(cm, k=1)
+    mask = cm[iu] > threshold
+    ia, ib = iu[0][mask], iu[1][mask]
+    cols = corr.columns.to_numpy()
+    pairs = list(zip(cols[ia], cols[ib], cm[iu][mask]))
+
+    # extract the value matrix and validity masks once; every pair test
+    # then works on raw aligned arrays instead of re-running dropna and
+    # index intersections
+    values = pivot.to_numpy(dtype=np.float64)
+    valid = ~np.isnan(values)
+    col_pos = {c: i for i, c in enumerate(cols)}
+
+    # pairs are independent, so test them across cores
+    records = Parallel(n_jobs=-1)(
+        delayed(_test_pair)(
+            values[:, col_pos[a]], values[:, col_pos[b]],
+            valid[:, col_pos[a]], valid[:, col_pos[b]],
+            a, b, coeff, min_obs,
+        )
+        for a, b, coeff in pairs
+    )
+    records = [r for r in records if r is not None]
     return pd.DataFrame(records).sort_values("pval").reset_index(drop=True)
 
 
+@njit(cache=True)
+def rolling_mean_std(x: np.ndarray, w: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Rolling mean and sample std (ddof=1) in one sweep using Welford's
+    add/remove-one updates. NaN until the window is full, like pandas
+    rolling(w).
+    """
+    n = x.shape[0]
+    m = np.full(n, np.nan)
+    s = np.full(n, np.nan)
+    mean = 0.0
+    m2 = 0.0
+    for i in range(n):
+        xi = x[i]
+        if i < w:
+            delta = xi - mean
+            mean += delta / (i + 1)
+            m2 += delta * (xi - mean)
+        else:
+            xo = x[i - w]
+            delta = xi - xo
+            old_mean = mean
+            mean += delta / w
+            m2 += delta * (xi - mean + xo - old_mean)
+        if i >= w - 1:
+            m[i] = mean
+            s[i] = np.sqrt(m2 / (w - 1)) if m2 > 0.0 else 0.0
+    return m, s
+
+
 def strategy_preparation(
     df: pd.DataFrame,
     A_id: str = "lme_0",
@@ -73,41 +164,42 @@ def strategy_preparation(
     """
     Build spread and z-score series for a specified cointegrated pair.
     """
-    dedup = df.drop_duplicates(subset=["timestamp", "id"])
-    mid = dedup.pivot(index="timestamp", columns="id", values="mid_usd")
-    ask = dedup.pivot(index="timestamp", columns="id", values="ask_usd")
-    bid = dedup.pivot(index="timestamp", columns="id", values="bid_usd")
-    spread_df = dedup.pivot(index="timestamp", columns="id", values="spread_usd")
-
-    a = mid[A_id].dropna()
-    b = mid[B_id].dropna()
-    idx = a.index.intersection(b.index)
-
-    y = a.loc[idx]
-    x = b.loc[idx]
-    model = sm.OLS(y, sm.add_constant(x)).fit()
-    beta = model.params.iloc[1]
+    # only two instruments matter, so join their long-form slices directly
+    # instead of pivoting every id to wide and intersecting the holes
+    cols = ["mid_usd", "ask_usd", "bid_usd", "spread_usd"]
+    sub = df[df["id"].isin((A_id, B_id))]
+    dedup = sub.drop_duplicates(subset=["timestamp", "id"])
+    da = dedup.loc[dedup["id"] == A_id].set_index("timestamp")[cols]
+    db = dedup.loc[dedup["id"] == B_id].set_index("timestamp")[cols]
+    joined = da.join(db, how="inner", lsuffix="_A", rsuffix="_B").sort_index()
+
+    idx = joined.index
+    y = joined["mid_usd_A"]
+    x = joined["mid_usd_B"]
+    _, beta, _ = _fit_line(y.to_numpy(), x.to_numpy())
 
     spread = y - beta * x
-    z = (spread - spread.rolling(60).mean()) / spread.rolling(60).std()
+    sp = spread.to_numpy()
+    roll_mean, roll_std = rolling_mean_std(sp, 60)
+    z = (sp - roll_mean) / roll_std
 
     signals = pd.DataFrame({
         "timestamp": idx,
         "A": y,
         "B": x,
-        "ask_A": ask[A_id].loc[idx],
-        "bid_A": bid[A_id].loc[idx],
-        "ask_B": ask[B_id].loc[idx],
-        "bid_B": bid[B_id].loc[idx],
-        "spread_A": spread_df[A_id].loc[idx],
-        "spread_B": spread_df[B_id].loc[idx],
+        "ask_A": joined["ask_usd_A"],
+        "bid_A": joined["bid_usd_A"],
+        "ask_B": joined["ask_usd_B"],
+        "bid_B": joined["bid_usd_B"],
+        "spread_A": joined["spread_usd_A"],
+        "spread_B": joined["spread_usd_B"],
         "model_spread": spread,
         "zscore": z,
         "beta": beta
     }).dropna().reset_index(drop=True)
 
-    filename = f"spread_signals_{A_id}_{B_id}.csv"
-    signals.to_csv(filename, index=False)
+    filename = f"spread_signals_{A_id}_{B_id}.parquet"
+    signals.to_parquet(filename, index=False, compression="zstd")
     return signals
 
 if __name__ == "__main__":
@@ -1,11 +1,76 @@
 
+from dataclasses import dataclass
+
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
+from numba import njit
+
+
+@dataclass
+class SignalArrays:
+    """Structure-of-arrays view of the signal columns run_strategy reads."""
+    timestamp: np.ndarray
+    zscore: np.ndarray
+    ask_A: np.ndarray
+    bid_A: np.ndarray
+    ask_B: np.ndarray
+    bid_B: np.ndarray
+    spread_A: np.ndarray
+    spread_B: np.ndarray
+
+
+_SIGNAL_FIELDS = ("zscore", "ask_A", "bid_A", "ask_B", "bid_B", "spread_A", "spread_B")
+
+
+def to_arrays(df: pd.DataFrame) -> SignalArrays:
+    """Extract the signal columns as contiguous float64 arrays."""
+    return SignalArrays(
+        timestamp=df["timestamp"].to_numpy(),
+        **{c: df[c].to_numpy(dtype=np.float64, copy=False) for c in _SIGNAL_FIELDS},
+    )
+
+
+@njit(cache=True)
+def _pair_trades(
+    events, long_entry, short_entry, long_exit, short_exit,
+    out_entry, out_exit, out_dir
+):
+    """
+    Resolve overlapping signals into (entry_bar, exit_bar, direction) trades.
+    Walks only the candidate bars in `events` — O(#signals), not O(#bars).
+    Returns the number of closed trades.
+    """
+    position = 0
+    entry = 0
+    k = 0
+
+    for j in range(events.shape[0]):
+        i = events[j]
+        if position == 0:
+            if short_entry[i]: #simple strategy logic
+                position = -1
+                entry = i
+            elif long_entry[i]:
+                position = 1
+                entry = i
+        elif position == 1 and long_exit[i]:
+            out_entry[k] = entry
+            out_exit[k] = i
+            out_dir[k] = 1
+            k += 1
+            position = 0
+        elif position == -1 and short_exit[i]:
+            out_entry[k] = entry
+            out_exit[k] = i
+            out_dir[k] = -1
+            k += 1
+            position = 0
+
+    return k
 
 
 def run_strategy(
-    df: pd.DataFrame,
+    df: pd.DataFrame | SignalArrays,
     A_id: str,
     B_id: str,
     z_entry: float = 6.0,
@@ -14,9 +79,11 @@ def run_strategy(
 ) -> pd.DataFrame:
     """
     Execute pairs trading based on z-score signals.
+    Accepts the signals DataFrame or a prebuilt SignalArrays.
     A_id and B_id identify the instruments for naming outputs.
     """
-    if df.empty:
+    sig = to_arrays(df) if isinstance(df, pd.DataFrame) else df
+    if sig.zscore.size == 0:
         raise ValueError("Signals DataFrame is empty")
 
     # Contract sizes and commission rates
@@ -30,66 +97,69 @@ def run_strategy(
     rate_a = commission_rates[key_a]
     rate_b = commission_rates[key_b]
 
-    position = 0
-    entry_price_a = entry_price_b = qty_a = qty_b = 0.0
-    pnl_list = []
-
-    for row in df.itertuples(index=False):
-        z = row.zscore
-        ask_a, bid_a = row.ask_A, row.bid_A
-        ask_b, bid_b = row.ask_B, row.bid_B
-        spread_a, spread_b = row.spread_A, row.spread_B
-        ts = row.timestamp
-
-        #no info on price step so we use spread as slippage
-        slippage_a = spread_a
-        slippage_b = spread_b
-
-        if position == 0:
-            if z > z_entry: #simple strategy logic
-                position = -1
-                entry_price_a = bid_a - slippage_a #executing on market + slippage (worst scenario)
-                entry_price_b = ask_b + slippage_b
-                qty_a = notional / entry_price_a
-                qty_b = notional / entry_price_b
-            elif z < -z_entry:
-                position = 1
-                entry_price_a = ask_a + slippage_a
-                entry_price_b = bid_b - slippage_b
-                qty_a = notional / entry_price_a
-                qty_b = notional / entry_price_b
-
-
-
-
-        elif position == 1 and z >= z_exit:
-            exit_price_a = bid_a - slippage_a
-            exit_price_b = ask_b + slippage_b
-            comm_a = rate_a * exit_price_a * size_a * qty_a * 2  #comissions for a roundtrip
-            comm_b = rate_b * exit_price_b * size_b * qty_b * 2
-            pnl = (
-                (exit_price_a - entry_price_a) * qty_a
-                - (exit_price_b - entry_price_b) * qty_b
-                - comm_a - comm_b
-            )
-
-            pnl_list.append((ts, pnl))
-            position = 0
-
-        elif position == -1 and z <= z_exit:
-            exit_price_a = ask_a + slippage_a
-            exit_price_b = bid_b - slippage_b
-            comm_a = rate_a * exit_price_a * size_a * qty_a * 2
-            comm_b = rate_b * exit_price_b * size_b * qty_b * 2
-            pnl = (
-                (entry_price_a - exit_price_a) * qty_a
-                - (entry_price_b - exit_price_b) * qty_b
-                - comm_a - comm_b
-            )
-            pnl_list.append((ts, pnl))
-            position = 0
-
-    pnl_df = pd.DataFrame(pnl_list, columns=["timestamp", "pnl"])
+    # whole-array signal masks; the scan below only resolves overlaps
+    z = sig.zscore
+    long_entry = z < -z_entry
+    short_entry = z > z_entry
+    long_exit = z >= z_exit
+    short_exit = z <= z_exit
+
+    events = np.flatnonzero(long_entry | short_entry | long_exit | short_exit)
+
+    # every trade consumes at least two candidate bars, so this bounds
+    # the trade count
+    cap = events.size // 2 + 1
+    out_entry = np.empty(cap, np.int64)
+    out_exit = np.empty(cap, np.int64)
+    out_dir = np.empty(cap, np.int64)
+
+    k = _pair_trades(
+        events, long_entry, short_entry, long_exit, short_exit,
+        out_entry, out_exit, out_dir,
+    )
+    ei, xi, d = out_entry[:k], out_exit[:k], out_dir[:k].astype(np.float64)
+
+    # long enters at the ask, short at the bid; exits mirror (spread = slippage)
+    long_mask = d > 0
+    entry_price_a = np.where(
+        long_mask,
+        sig.ask_A[ei] + sig.spread_A[ei],
+        sig.bid_A[ei] - sig.spread_A[ei],
+    )
+    entry_price_b = np.where(
+        long_mask,
+        sig.bid_B[ei] - sig.spread_B[ei],
+        sig.ask_B[ei] + sig.spread_B[ei],
+    )
+    exit_price_a = np.where(
+        long_mask,
+        sig.bid_A[xi] - sig.spread_A[xi],
+        sig.ask_A[xi] + sig.spread_A[xi],
+    )
+    exit_price_b = np.where(
+        long_mask,
+        sig.ask_B[xi] + sig.spread_B[xi],
+        sig.bid_B[xi] - sig.spread_B[xi],
+    )
+
+    # loop-invariant roundtrip commission factors
+    k_a = 2.0 * rate_a * size_a
+    k_b = 2.0 * rate_b * size_b
+
+    qty_a = notional / entry_price_a
+    qty_b = notional / entry_price_b
+    comm_a = k_a * exit_price_a * qty_a  #comissions for a roundtrip
+    comm_b = k_b * exit_price_b * qty_b
+    pnl = (
+        d * ((exit_price_a - entry_price_a) * qty_a
+             - (exit_price_b - entry_price_b) * qty_b)
+        - comm_a - comm_b
+    )
+
+    pnl_df = pd.DataFrame({
+        "timestamp": sig.timestamp[xi],
+        "pnl": pnl,
+    })
     pnl_df["timestamp"] = pd.to_datetime(pnl_df["timestamp"])
     pnl_df["cum_pnl"] = pnl_df["pnl"].cumsum()
 
@@ -113,22 +183,36 @@ def run_strategy(
 
 
 
-def plot_equity_curve(df: pd.DataFrame, output_path: str = "equity_commissions_excluded.png") -> None:
+def plot_equity_curve(
+    df: pd.DataFrame,
+    output_path: str = "equity_commissions_excluded.png",
+    enable_plot: bool = True,
+) -> None:
     """
     Plot cumulative PnL curve for given pair.
+    Set enable_plot=False to skip plotting entirely in hot paths.
     """
-    plt.figure(figsize=(10, 4))
-    plt.plot(df["timestamp"], df["cum_pnl"], label="Equity Curve")
-    plt.title("Cumulative PnL — Pair")
-    plt.xlabel("Timestamp")
-    plt.ylabel("Cumulative PnL (USD)")
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig(output_path)
+    if not enable_plot:
+        return
+
+    # lazy import + object-oriented Agg rendering: no pyplot state
+    # machinery, and matplotlib is only paid for when a plot is wanted
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(10, 4))
+    ax = fig.subplots()
+    ax.plot(df["timestamp"].to_numpy(), df["cum_pnl"].to_numpy(), label="Equity Curve")
+    ax.set_title("Cumulative PnL — Pair")
+    ax.set_xlabel("Timestamp")
+    ax.set_ylabel("Cumulative PnL (USD)")
+    ax.grid(True)
+    fig.tight_layout()
+    FigureCanvasAgg(fig).print_figure(output_path)
 
 
 if __name__ == "__main__":
-    signals = pd.read_csv("spread_signals_lme_0_shfe_0.csv")
+    signals = pd.read_parquet("spread_signals_lme_0_shfe_0.parquet")
     df_pnl = run_strategy(signals, A_id="lme_0", B_id="shfe_0")
     plot_equity_curve(df_pnl)
 